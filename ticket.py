@@ -1,16 +1,17 @@
 # tickets.py  ── minimal break-even calculator
+import numpy as np
 import pandas as pd
 
 # ──────────── USER INPUTS ────────────
 # this is based on 2024 hackathon, change accordingly
 # particularly the price variable and the sold variable to approximate attendance
 TIERS = {                       # leave empty {} if you use only simple_price
-    "Early Bird + Shirt (UQ)"     : dict(price=55, sold=51, merch=True),
-    "Early Bird (UQ)"             : dict(price=35, sold=86, merch=False),
-    "UQ Regular"                  : dict(price=45, sold=14, merch=False),
-    "Early Bird (Non-UQ)"         : dict(price=40, sold=9 , merch=False),
-    "Early Bird + Shirt (Non-UQ)" : dict(price=60, sold=4 , merch=True),
-    "Non-UQ"                      : dict(price=50, sold=3 , merch=False)
+    "Early Bird + Shirt (UQ)"     : dict(price=55, sold=51, merch=True , uq=True),
+    "Early Bird (UQ)"             : dict(price=35, sold=86, merch=False, uq=True),
+    "UQ Regular"                  : dict(price=45, sold=14, merch=False, uq=True),
+    "Early Bird (Non-UQ)"         : dict(price=40, sold=9 , merch=False, uq=False),
+    "Early Bird + Shirt (Non-UQ)" : dict(price=60, sold=4 , merch=True , uq=False),
+    "Non-UQ"                      : dict(price=50, sold=3 , merch=False, uq=False)
 }
 # refund rate
 REFUND     = 0.03      # φ
@@ -24,6 +25,14 @@ CATERING   = 4000
 #cost of merch per unit
 MERCH_UNIT = 20
 
+# demand model for the optimiser, calibrated at each tier's (price, sold) above
+# own-price elasticity: % of a tier's sales lost per % price rise
+ELASTICITY   = 1.2
+# share of the tickets a tier loses to a price rise that move to the other tiers
+SUBSTITUTION = 0.5
+# how likely switching UQ <-> Non-UQ is, relative to switching within a group (shirt / no shirt, early / regular)
+CROSS_GROUP  = 0.25
+
 # ──────────── CORE FUNCTIONS ────────────
 
 # the math below is correct, dont need to change any of it just the inputs above
@@ -53,6 +62,212 @@ def simple_price(headcount: int, *, with_merch=False) -> dict:
     P_gross = P_net / (1 - PLATFORM_F)
     return dict(P_net=P_net, P_gross=P_gross, var_cost=v)
 
+# ──────────── PRICE OPTIMISER ────────────
+
+# linear demand around last year's prices, with switching capped at the buyers a tier had:
+#   Q_i(P) = max(0, sold_i - b_i ΔP_i + Σ_j M_ij min(sold_j, b_j max(ΔP_j, 0)))
+# D[i, i] = -b_i (tickets tier i loses per $1) and D[i, j] = M_ij b_j, the tickets
+# tier i gains per $1 rise in tier j while tier j still has buyers to lose.
+# Profit is the break-even equation moved to one side:
+#   pi(P) = (1-φ) Σ ((1-f) P_i - v_i) Q_i - (F - S)
+def demand_matrix(tiers: dict, elasticity=ELASTICITY, substitution=SUBSTITUTION,
+                  cross_group=CROSS_GROUP) -> np.ndarray:
+    df = pd.DataFrame.from_dict(tiers, orient="index")
+    price = df["price"].to_numpy(dtype=float)
+    sold = df["sold"].to_numpy(dtype=float)
+    uq = df["uq"].to_numpy() if "uq" in df else np.ones(len(df), dtype=bool)
+    # tiers with no sales or a $0 price last year have no demand to calibrate:
+    # their rows and columns stay zero, like the padding tiers in optimize_season
+    active = (sold > 0) & (price > 0)
+
+    b = np.divide(elasticity * sold, price, out=np.zeros_like(sold), where=active)
+    # where tier j's lost buyers go: same group first, other group scaled by cross_group
+    w = np.where(uq[:, None] == uq[None, :], 1.0, cross_group)
+    np.fill_diagonal(w, 0)
+    w[~active, :] = 0
+    col_sum = w.sum(axis=0)
+    w = np.divide(w, col_sum, out=np.zeros_like(w), where=col_sum > 0)
+
+    D = substitution * w * b[None, :]
+    np.fill_diagonal(D, -b)
+    return D
+
+def _profit_and_grads(P, q0, P0, D, v, gap, refund, fee):
+    """Profit, attendance and their gradients for a batch of events (arrays are E x n)."""
+    b = -np.diagonal(D, axis1=1, axis2=2)
+    M = np.divide(D, b[:, None, :], out=np.zeros_like(D), where=b[:, None, :] > 0)
+    M[:, np.arange(D.shape[1]), np.arange(D.shape[1])] = 0
+    dP = P - P0
+    # buyers tier j sends elsewhere: only on a price rise, and never more than it had
+    lost = b * np.maximum(dP, 0)
+    switching = (lost > 0) & (lost < q0)
+    sent = np.minimum(lost, q0)
+    Q_linear = q0 - b * dP + np.einsum("eij,ej->ei", M, sent)
+    selling = Q_linear > 0          # tiers priced out of the market contribute nothing
+    Q = np.where(selling, Q_linear, 0.0)
+    # dQ_linear / dP: own slope plus inflows from tiers that are still losing buyers
+    J = M * (b * switching)[:, None, :]
+    J[:, np.arange(D.shape[1]), np.arange(D.shape[1])] = -b
+    margin = (1 - fee)[:, None] * P - v
+    profit = (1 - refund) * (margin * Q).sum(axis=1) - gap
+    d_profit = (1 - refund)[:, None] * ((1 - fee)[:, None] * Q
+                                        + np.einsum("eij,ei->ej", J, margin * selling))
+    d_attendance = np.einsum("eij,ei->ej", J, selling.astype(float))
+    return profit, Q.sum(axis=1), d_profit, d_attendance, Q
+
+def _ascend(P, weight, q0, P0, D, v, gap, refund, fee, lo, hi, iters, tol):
+    """Projected gradient ascent on  profit + weight * attendance,  one step size per event."""
+    H = (1 - refund)[:, None, None] * (1 - fee)[:, None, None] * (D + D.transpose(0, 2, 1))
+    # events with non-finite inputs are never stepped, so they can't hold the batch back
+    running = np.isfinite(H).all(axis=(1, 2)) & np.isfinite(P).all(axis=1)
+    L = np.zeros(len(P))
+    L[running] = np.linalg.norm(H[running], ord=2, axis=(1, 2))
+    step = np.where(L > 0, 1 / np.where(L > 0, L, 1), 0.0)[:, None]
+    P = P.copy()
+    for _ in range(iters):
+        rows = np.flatnonzero(running)
+        if rows.size == 0:
+            break
+        _, _, d_profit, d_attendance, _ = _profit_and_grads(
+            P[rows], q0[rows], P0[rows], D[rows], v[rows], gap[rows], refund[rows], fee[rows])
+        P_new = np.clip(P[rows] + step[rows] * (d_profit + weight[rows, None] * d_attendance),
+                        lo[rows], hi[rows])
+        moved = np.abs(P_new - P[rows]).max(axis=1)
+        P[rows] = P_new
+        running[rows] = moved >= tol      # converged (or NaN) events stop updating
+    return P
+
+def optimize_prices_batch(q0, P0, D, v, gap, refund, fee, P_start, *,
+                          objective="attendance", lo=None, hi=None,
+                          iters=2000, bisect_steps=40, tol=1e-6):
+    """
+    Joint tier prices for E events at once. Arrays are (E, n); D is (E, n, n);
+    gap, refund and fee are (E,). Pad events with fewer tiers using zeros.
+
+    objective="surplus"    → maximise profit above break-even
+    objective="attendance" → maximise expected tickets subject to profit >= 0,
+                             by bisecting on the weight given to attendance
+
+    Starts from P_start (the break-even prices) and returns a local optimum:
+    (P_gross, Q, profit, feasible). feasible is False where no prices break
+    even, in which case the surplus-maximising prices are returned.
+    """
+    if objective not in ("attendance", "surplus"):
+        raise ValueError("objective must be 'attendance' or 'surplus'")
+    q0, P0, v, P_start = (np.asarray(a, dtype=float) for a in (q0, P0, v, P_start))
+    D = np.asarray(D, dtype=float)
+    gap, refund, fee = (np.asarray(a, dtype=float) for a in (gap, refund, fee))
+    lo = np.zeros_like(P0) if lo is None else np.asarray(lo, dtype=float)
+    if hi is None:   # no cap: past a tier's choke price its gradient is zero, so ascent stops there
+        b = -np.diagonal(D, axis1=1, axis2=2)
+        hi = np.where(b > 0, np.inf, P0)     # tiers without demand stay frozen
+    hi = np.maximum(hi, lo)
+    args = (q0, P0, D, v, gap, refund, fee, lo, hi, iters, tol)
+
+    P_best = _ascend(np.clip(P_start, lo, hi), np.zeros(len(P0)), *args)
+    profit, _, _, _, Q = _profit_and_grads(P_best, q0, P0, D, v, gap, refund, fee)
+    feasible = profit >= -tol
+    if objective == "surplus":
+        return P_best, Q, profit, feasible
+
+    # more weight on attendance → lower prices → less profit; find the largest weight that breaks even
+    w_lo, w_hi = np.zeros(len(P0)), np.full(len(P0), 1e4)
+    P_hi = _ascend(P_best.copy(), w_hi, *args)
+    still_profitable = _profit_and_grads(P_hi, q0, P0, D, v, gap, refund, fee)[0] >= 0
+    P_feasible = np.where(still_profitable[:, None], P_hi, P_best)
+    P_loss = P_hi
+    searching = feasible & ~still_profitable
+    P = P_best.copy()
+    for _ in range(bisect_steps):
+        if not searching.any():
+            break
+        w_mid = np.sqrt(np.maximum(w_lo, 1e-4) * w_hi)   # geometric: the weight spans decades
+        P = _ascend(P, w_mid, *args)
+        ok = _profit_and_grads(P, q0, P0, D, v, gap, refund, fee)[0] >= 0
+        P_feasible = np.where((searching & ok)[:, None], P, P_feasible)
+        P_loss = np.where((searching & ~ok)[:, None], P, P_loss)
+        w_lo = np.where(searching & ok, w_mid, w_lo)
+        w_hi = np.where(searching & ~ok, w_mid, w_hi)
+
+    # priced-out tiers make profit jump as the weight moves, so spend any surplus
+    # left over by walking from the last break-even prices towards the last loss-making ones
+    t_lo, t_hi = np.zeros(len(P0)), np.where(searching, 1.0, 0.0)
+    for _ in range(bisect_steps):
+        t_mid = (t_lo + t_hi) / 2
+        P = P_feasible + t_mid[:, None] * (P_loss - P_feasible)
+        ok = _profit_and_grads(P, q0, P0, D, v, gap, refund, fee)[0] >= 0
+        t_lo = np.where(ok, t_mid, t_lo)
+        t_hi = np.where(ok, t_hi, t_mid)
+    P_walked = P_feasible + t_lo[:, None] * (P_loss - P_feasible)
+    gained = (_profit_and_grads(P_walked, q0, P0, D, v, gap, refund, fee)[1]
+              > _profit_and_grads(P_feasible, q0, P0, D, v, gap, refund, fee)[1])
+    P_feasible = np.where(gained[:, None], P_walked, P_feasible)
+
+    profit, _, _, _, Q = _profit_and_grads(P_feasible, q0, P0, D, v, gap, refund, fee)
+    return P_feasible, Q, profit, feasible
+
+def _event_arrays(tiers, catering, fixed, sponsor, refund, fee, merch_unit):
+    """Break-even warm start plus the demand model inputs for one event."""
+    df = pd.DataFrame.from_dict(tiers, orient="index")
+    sold = df["sold"].to_numpy(dtype=float)
+    price = df["price"].to_numpy(dtype=float)
+    active = (sold > 0) & (price > 0)        # others are frozen at $0 and reported as NaN
+    q0 = np.where(active, sold, 0.0)
+    head_total = q0.sum()
+
+    v_cat = catering / head_total if head_total > 0 else 0
+    v = v_cat + np.where(df["merch"].to_numpy(dtype=bool), merch_unit, 0)
+    gap_share = (fixed - sponsor) * q0 / head_total if head_total > 0 else np.zeros_like(q0)
+    P_gross = np.full_like(q0, np.nan)       # same as price_tiers for the active tiers
+    P_gross[active] = (v[active] + gap_share[active] / ((1 - refund) * q0[active])) / (1 - fee)
+    return dict(names=list(df.index), active=active, q0=q0, P0=np.where(active, price, 0.0),
+                D=demand_matrix(tiers), v=np.where(active, v, 0.0), gap=fixed - sponsor, P_start=P_gross)
+
+def optimize_season(events: list, objective="attendance") -> list:
+    """
+    Optimises every event in one batched solve. Each event is a dict with
+    tiers (like TIERS) and optional catering, fixed, sponsor, refund,
+    platform_fee, merch_unit (defaulting to the inputs above).
+    Returns one DataFrame per event.
+    """
+    if not events:
+        return []
+    arrays, scalars = [], []
+    for ev in events:
+        refund = ev.get("refund", REFUND)
+        fee = ev.get("platform_fee", PLATFORM_F)
+        arrays.append(_event_arrays(ev["tiers"], ev.get("catering", CATERING), ev.get("fixed", F_FIXED),
+                                    ev.get("sponsor", SPONSOR), refund, fee, ev.get("merch_unit", MERCH_UNIT)))
+        scalars.append((refund, fee))
+
+    n = max(len(a["names"]) for a in arrays)
+    def pad(key, fill=0.0):
+        return np.array([np.pad(a[key], (0, n - len(a[key])), constant_values=fill) for a in arrays])
+    D = np.zeros((len(arrays), n, n))     # padding tiers: no demand, so their price bounds collapse to $0
+    for e, a in enumerate(arrays):
+        k = len(a["names"])
+        D[e, :k, :k] = a["D"]
+
+    P, Q, profit, feasible = optimize_prices_batch(
+        pad("q0"), pad("P0"), D, pad("v"), np.array([a["gap"] for a in arrays]),
+        np.array([s[0] for s in scalars]), np.array([s[1] for s in scalars]), np.nan_to_num(pad("P_start")),
+        objective=objective)
+
+    results = []
+    for e, a in enumerate(arrays):
+        k = len(a["names"])
+        results.append(pd.DataFrame({
+            "Tier": a["names"], "P_break_even": a["P_start"],
+            "P_gross": np.where(a["active"], P[e, :k], np.nan),
+            "expected_sold": np.where(a["active"], Q[e, :k], np.nan),
+            "priced_out": a["active"] & (Q[e, :k] <= 0),    # P_gross is then any price past the choke point
+            "profit": profit[e], "feasible": feasible[e],
+        }))
+    return results
+
+def optimize_tier_prices(tiers: dict, objective="attendance") -> pd.DataFrame:
+    return optimize_season([dict(tiers=tiers)], objective=objective)[0]
+
 # ──────────── DEMO ────────────
 if __name__ == "__main__":
     # 1) hackathon tier pricing
@@ -61,6 +276,24 @@ if __name__ == "__main__":
         print(price_tiers(TIERS).to_string(index=False,
               float_format=lambda x: f"{x:,.2f}"))
 
+        print("\n=== attendance-maximising tier prices (break-even) ===")
+        print(optimize_tier_prices(TIERS, objective="attendance").to_string(index=False,
+              float_format=lambda x: f"{x:,.2f}"))
+
+        print("\n=== surplus-maximising tier prices ===")
+        print(optimize_tier_prices(TIERS, objective="surplus").to_string(index=False,
+              float_format=lambda x: f"{x:,.2f}"))
+
+        # sanity check: pricing one tier out of the market must not create buyers elsewhere
+        ev = _event_arrays(TIERS, CATERING, F_FIXED, SPONSOR, REFUND, PLATFORM_F, MERCH_UNIT)
+        batch = [x[None] for x in (ev["q0"], ev["P0"], ev["D"], ev["v"])] + \
+                [np.array([x], dtype=float) for x in (ev["gap"], REFUND, PLATFORM_F)]
+        for i in range(len(ev["names"])):
+            P = ev["P0"].copy()
+            P[i] = 1000
+            total = _profit_and_grads(P[None], *batch)[1][0]
+            assert total <= ev["q0"].sum() + 1e-9, f"pricing out {ev['names'][i]} grew sales to {total:.1f}"
+
     # 2) simple single-price event (100 seats, base ticket)
     # change the headcount number to approximate attendance
     print("\n=== simple event (100 seats) ===")
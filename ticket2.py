@@ -2,59 +2,185 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import json # For serializing/deserializing Ticket Details
+import io
+import importlib.util
 
 # Default values (remains the same)
 DEFAULT_REFUND_RATE = 0.03
 DEFAULT_PLATFORM_FEE_RATE = 0.04
 DEFAULT_MERCH_UNIT_COST = 20.00
 DEFAULT_PRICE_INCREASE_CAP = 5.00
+# Parquet export needs a pandas parquet engine; the button is hidden without one
+PARQUET_EXPORT_AVAILABLE = any(importlib.util.find_spec(engine) is not None for engine in ("pyarrow", "fastparquet"))
+
+class ScenarioGraph:
+    """Small dependency graph of cached intermediates; changing an input only invalidates its downstream nodes."""
+    def __init__(self):
+        self._nodes = {} # node name -> (dependency names, compute function)
+        self._inputs = {}
+        self._values = {}
+        self.recompute_counts = {}
+        self.reuse_counts = {}
+        self.last_run = {'recomputed': [], 'reused': []}
+
+    def add_node(self, name, deps, func):
+        self._nodes[name] = (tuple(deps), func)
+
+    def set_inputs(self, **inputs):
+        for name, value in inputs.items():
+            if name in self._inputs and self._inputs[name] == value:
+                continue
+            self._inputs[name] = value
+            self._invalidate(name)
+
+    def _invalidate(self, name):
+        for node, (deps, _) in self._nodes.items():
+            if name in deps:
+                self._values.pop(node, None)
+                self._invalidate(node)
+
+    def evaluate(self, *names):
+        """Returns the requested node values, recording which nodes were recomputed vs reused for this run."""
+        self.last_run = {'recomputed': [], 'reused': []}
+        results = [self._get(name) for name in names]
+        for node in self.last_run['recomputed']:
+            self.recompute_counts[node] = self.recompute_counts.get(node, 0) + 1
+        for node in self.last_run['reused']:
+            self.reuse_counts[node] = self.reuse_counts.get(node, 0) + 1
+        return results
+
+    def _mark_reused(self, name):
+        # A cached node implies everything upstream of it is cached too
+        if name not in self._nodes or name in self.last_run['reused'] or name in self.last_run['recomputed']:
+            return
+        self.last_run['reused'].append(name)
+        for dep in self._nodes[name][0]:
+            self._mark_reused(dep)
+
+    def _get(self, name):
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in self._values:
+            self._mark_reused(name)
+            return self._values[name]
+        deps, func = self._nodes[name]
+        value = func(*(self._get(dep) for dep in deps))
+        self._values[name] = value
+        self.last_run['recomputed'].append(name)
+        return value
+
+
+# ── scenario graph nodes: each works on every tested allocation at once ──
+def _node_tier_sales(total_attendees, merch_option, expected_merch):
+    """(regular sold, merch sold, input error note) for the merch option."""
+    if merch_option == "Optional Merch Tickets (separate prices)":
+        if expected_merch > total_attendees:
+            return 0, 0, "Input Error: Merch tickets > total attendees."
+        if total_attendees - expected_merch < 0:
+            return 0, 0, "Input Error: Negative regular tickets calculation."
+        return total_attendees - expected_merch, expected_merch, ""
+    return total_attendees, 0, ""
+
+def _node_tiers(tier_sales, merch_option):
+    """Active tiers (sold > 0): names and sold counts."""
+    reg_sold, merch_sold, _ = tier_sales
+    tiers = []
+    if merch_option == "No Merch":
+        if reg_sold > 0: tiers.append(("Regular", reg_sold))
+    elif merch_option == "Bundled Merch (for all tickets)":
+        if reg_sold > 0: tiers.append(("Bundled", reg_sold))
+    elif merch_option == "Optional Merch Tickets (separate prices)":
+        if reg_sold > 0: tiers.append(("Regular", reg_sold))
+        if merch_sold > 0: tiers.append(("Merch-Inclusive", merch_sold))
+    return {
+        'names': tuple(t[0] for t in tiers),
+        'sold': np.array([t[1] for t in tiers], dtype=float),
+    }
+
+def _node_tier_merch_costs(tiers, merch_unit_cost):
+    return np.array([merch_unit_cost if name in ("Bundled", "Merch-Inclusive") else 0
+                     for name in tiers['names']], dtype=float)
+
+def _node_tier_last_year_prices(tiers, ly_regular_price, ly_merch_price):
+    return np.array([ly_merch_price if name == "Merch-Inclusive" else ly_regular_price
+                     for name in tiers['names']], dtype=float)
+
+def _node_catering_per_head(catering_cost, tiers):
+    total_sold = tiers['sold'].sum()
+    return catering_cost / total_sold if total_sold > 0 else 0
+
+def _node_variable_costs(catering_per_head, tier_merch_costs):
+    return catering_per_head + tier_merch_costs
+
+def _node_gap_shares(fixed_costs, allocations, tiers):
+    """(allocations x tiers) share of the fixed-cost gap, proportional to tier sales."""
+    total_sold = tiers['sold'].sum()
+    weights = tiers['sold'] / total_sold if total_sold > 0 else np.zeros_like(tiers['sold'])
+    gaps = fixed_costs - np.asarray(allocations, dtype=float)
+    return gaps[:, None] * weights[None, :]
+
+def _node_p_net(variable_costs, gap_shares, tiers, refund_rate):
+    denominator = (1 - refund_rate) * tiers['sold']
+    safe_denominator = np.where(denominator != 0, denominator, 1.0)
+    return np.where(denominator != 0, variable_costs + gap_shares / safe_denominator, np.inf)
+
+def _node_p_gross(p_net, platform_fee_rate):
+    denominator = 1 - platform_fee_rate
+    if denominator == 0:
+        return np.full_like(p_net, np.inf)
+    return p_net / denominator
+
+def _node_too_expensive(p_gross, tier_last_year_prices, price_increase_cap):
+    """(flags, mask of cells where the flag is defined)."""
+    defined = np.isfinite(p_gross) & ~np.isnan(tier_last_year_prices)[None, :]
+    return p_gross > (tier_last_year_prices + price_increase_cap)[None, :], defined
+
+def _node_budget(allocations, remaining_budget):
+    """(exceeds remaining budget mask, potential remaining budget) per allocation."""
+    allocations = np.asarray(allocations, dtype=float)
+    return allocations > remaining_budget, remaining_budget - allocations
+
+def build_scenario_graph():
+    graph = ScenarioGraph()
+    graph.add_node('tier_sales', ['total_attendees', 'merch_option', 'expected_merch'], _node_tier_sales)
+    graph.add_node('tiers', ['tier_sales', 'merch_option'], _node_tiers)
+    graph.add_node('tier_merch_costs', ['tiers', 'merch_unit_cost'], _node_tier_merch_costs)
+    graph.add_node('tier_last_year_prices', ['tiers', 'ly_regular_price', 'ly_merch_price'], _node_tier_last_year_prices)
+    graph.add_node('catering_per_head', ['catering_cost', 'tiers'], _node_catering_per_head)
+    graph.add_node('variable_costs', ['catering_per_head', 'tier_merch_costs'], _node_variable_costs)
+    graph.add_node('gap_shares', ['fixed_costs', 'allocations', 'tiers'], _node_gap_shares)
+    graph.add_node('p_net', ['variable_costs', 'gap_shares', 'tiers', 'refund_rate'], _node_p_net)
+    graph.add_node('p_gross', ['p_net', 'platform_fee_rate'], _node_p_gross)
+    graph.add_node('too_expensive', ['p_gross', 'tier_last_year_prices', 'price_increase_cap'], _node_too_expensive)
+    graph.add_node('budget', ['allocations', 'remaining_budget'], _node_budget)
+    return graph
+
 
 class SponsorshipManager:
     def __init__(self, total_annual_sponsorship):
         self.total_annual_sponsorship = total_annual_sponsorship
         self.remaining_annual_sponsorship = total_annual_sponsorship
         self.planned_events = [] # List of event dictionaries
+        # Bumped on every mutation of planned_events; derived artifacts are cached against it
+        self.version = 0
+        self._artifact_cache = {}
+        self.scenario_graph = build_scenario_graph()
 
     def get_remaining_budget(self):
         return self.remaining_annual_sponsorship
 
-    def _calculate_multi_tier_prices(self, tier_definitions, fixed_costs_event,
-                                     sponsor_allocation_event, event_total_catering_cost,
-                                     sum_of_sales_for_active_tiers,
-                                     event_refund_rate, event_platform_fee_rate):
-        priced_tiers = []
-        catering_per_head = event_total_catering_cost / sum_of_sales_for_active_tiers if sum_of_sales_for_active_tiers > 0 else 0
-        
-        gap_to_cover_by_tickets = fixed_costs_event - sponsor_allocation_event
+    def _bump_version(self):
+        self.version += 1
+        self._artifact_cache = {}
 
-        for tier_def_original in tier_definitions:
-            tier_def = tier_def_original.copy()
-            tier_def['v_calc'] = catering_per_head + tier_def['merch_cost']
-            tier_priced_data = {**tier_def}
-
-            if tier_def['sold'] <= 0: 
-                tier_priced_data.update({'P_net': float('nan'), 'P_gross': float('nan'), 'gap_share': 0})
-                if 'v_calc' in tier_priced_data: del tier_priced_data['v_calc']
-                priced_tiers.append(tier_priced_data)
-                continue
-            
-            tier_gap_share = 0
-            if sum_of_sales_for_active_tiers > 0 : 
-                tier_gap_share = gap_to_cover_by_tickets * (tier_def['sold'] / sum_of_sales_for_active_tiers)
-            
-            tier_priced_data['gap_share'] = tier_gap_share
-            
-            denominator_p_net = (1 - event_refund_rate) * tier_def['sold']
-            P_net = tier_def['v_calc'] + (tier_gap_share / denominator_p_net) if denominator_p_net != 0 else float('inf')
-            
-            denominator_p_gross = (1 - event_platform_fee_rate)
-            P_gross = P_net / denominator_p_gross if denominator_p_gross != 0 else float('inf')
-            
-            tier_priced_data.update({'P_net': P_net, 'P_gross': P_gross})
-            if 'v_calc' in tier_priced_data: del tier_priced_data['v_calc'] 
-            priced_tiers.append(tier_priced_data)
-            
-        return priced_tiers
+    def cached_artifact(self, name, builder):
+        """Returns builder() cached for the current version; rebuilt only after planned events change."""
+        cached = self._artifact_cache.get(name)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        value = builder()
+        self._artifact_cache[name] = (self.version, value)
+        return value
 
     def plan_event_scenarios(self, event_name: str,
                              event_fixed_costs: float, event_total_catering_cost: float,
@@ -68,9 +194,7 @@ class SponsorshipManager:
                              event_refund_rate: float = DEFAULT_REFUND_RATE,
                              event_platform_fee_rate: float = DEFAULT_PLATFORM_FEE_RATE,
                              price_increase_cap: float = DEFAULT_PRICE_INCREASE_CAP):
-        scenarios_summary = []
-       
-
+        allocations = []
         for s_alloc_raw in sponsor_allocations_to_test:
             try:
                 s_alloc = float(s_alloc_raw)
@@ -78,7 +202,26 @@ class SponsorshipManager:
                 st.warning(f"Invalid sponsor allocation value skipped: {s_alloc_raw}")
                 continue
             if s_alloc < 0: continue
+            allocations.append(s_alloc)
+
+        # Only nodes downstream of inputs that changed since the last call are recomputed
+        graph = self.scenario_graph
+        graph.set_inputs(
+            fixed_costs=event_fixed_costs, catering_cost=event_total_catering_cost,
+            total_attendees=total_expected_attendees_overall, merch_option=merch_option,
+            merch_unit_cost=merch_unit_cost, expected_merch=expected_merch_tickets_sold_input,
+            ly_regular_price=last_year_regular_price, ly_merch_price=last_year_merch_price,
+            allocations=tuple(allocations), refund_rate=event_refund_rate,
+            platform_fee_rate=event_platform_fee_rate, price_increase_cap=price_increase_cap,
+            remaining_budget=self.remaining_annual_sponsorship
+        )
+        (reg_sold_calc, merch_sold_calc, input_error_note), tiers, p_gross, (too_expensive, too_expensive_defined), (exceeds_budget, potential_remaining) = graph.evaluate(
+            'tier_sales', 'tiers', 'p_gross', 'too_expensive', 'budget'
+        )
+        sum_of_sales_for_active_tiers = tiers['sold'].sum()
 
+        scenarios_summary = []
+        for i, s_alloc in enumerate(allocations):
             current_scenario_data = {
                 'event_name': event_name, 'sponsor_allocation_tested': s_alloc,
                 'fixed_costs_event': event_fixed_costs, 
@@ -91,56 +234,22 @@ class SponsorshipManager:
                 'price_increase_cap': price_increase_cap,
                 'P_gross_regular': None, 'is_too_expensive_regular': None, 'actual_regular_tickets_sold': 0,
                 'P_gross_merch': None, 'is_too_expensive_merch': None, 'actual_merch_tickets_sold': 0,
-                'notes': "", 'potential_remaining_annual_budget': self.remaining_annual_sponsorship - s_alloc
+                'notes': "", 'potential_remaining_annual_budget': float(potential_remaining[i])
             }
 
-            if s_alloc > self.remaining_annual_sponsorship:
+            if exceeds_budget[i]:
                 current_scenario_data['notes'] = "Exceeds remaining annual budget."
                 scenarios_summary.append(current_scenario_data)
                 continue
 
-            tier_definitions_for_calc = []
-            reg_sold_calc = 0 
-            merch_sold_calc = 0 
-            _total_overall = total_expected_attendees_overall
-            _expected_merch = expected_merch_tickets_sold_input
-
-            if merch_option == "No Merch":
-                reg_sold_calc = _total_overall
-            elif merch_option == "Bundled Merch (for all tickets)":
-                reg_sold_calc = _total_overall 
-            elif merch_option == "Optional Merch Tickets (separate prices)":
-                if _expected_merch > _total_overall: 
-                    current_scenario_data['notes'] = "Input Error: Merch tickets > total attendees."
-                    scenarios_summary.append(current_scenario_data)
-                    continue 
-                merch_sold_calc = _expected_merch
-                reg_sold_calc = _total_overall - merch_sold_calc
-                if reg_sold_calc < 0: 
-                    current_scenario_data['notes'] = "Input Error: Negative regular tickets calculation."
-                    scenarios_summary.append(current_scenario_data)
-                    continue
-            
+            if input_error_note:
+                current_scenario_data['notes'] = input_error_note
+                scenarios_summary.append(current_scenario_data)
+                continue
+
             current_scenario_data['actual_regular_tickets_sold'] = reg_sold_calc
             current_scenario_data['actual_merch_tickets_sold'] = merch_sold_calc
 
-            if merch_option == "No Merch":
-                if reg_sold_calc > 0:
-                    tier_definitions_for_calc.append({'name': "Regular", 'sold': reg_sold_calc, 'merch_cost': 0, 'last_year_price': last_year_regular_price})
-            elif merch_option == "Bundled Merch (for all tickets)":
-                if reg_sold_calc > 0: 
-                    tier_definitions_for_calc.append({'name': "Bundled", 'sold': reg_sold_calc, 'merch_cost': merch_unit_cost, 'last_year_price': last_year_regular_price})
-            elif merch_option == "Optional Merch Tickets (separate prices)":
-                if reg_sold_calc > 0:
-                    tier_definitions_for_calc.append({'name': "Regular", 'sold': reg_sold_calc, 'merch_cost': 0, 'last_year_price': last_year_regular_price})
-                if merch_sold_calc > 0:
-                    tier_definitions_for_calc.append({'name': "Merch-Inclusive", 'sold': merch_sold_calc, 'merch_cost': merch_unit_cost, 'last_year_price': last_year_merch_price})
-            
-            sum_of_sales_for_active_tiers = sum(tier['sold'] for tier in tier_definitions_for_calc)
-
-            if not ("Input Error" in current_scenario_data['notes']): # Clear only if not input error
-                 current_scenario_data['notes'] = ""
-
             if total_expected_attendees_overall == 0:
                 current_scenario_data['notes'] = "Overall expected attendees is 0."
             elif sum_of_sales_for_active_tiers == 0 and total_expected_attendees_overall > 0 : 
@@ -149,29 +258,17 @@ class SponsorshipManager:
             if current_scenario_data['notes']: 
                 scenarios_summary.append(current_scenario_data)
                 continue
-            
-            priced_tiers_results = self._calculate_multi_tier_prices(
-                tier_definitions_for_calc, event_fixed_costs, s_alloc,
-                event_total_catering_cost, sum_of_sales_for_active_tiers, 
-                event_refund_rate, event_platform_fee_rate
-            )
 
-            for tier_result in priced_tiers_results:
-                P_gross = tier_result['P_gross']
-                is_too_expensive = None
-                ly_price_for_tier = tier_result.get('last_year_price')
-                if pd.notnull(P_gross) and np.isfinite(P_gross) and pd.notnull(ly_price_for_tier):
-                    is_too_expensive = P_gross > (ly_price_for_tier + price_increase_cap)
+            for j, tier_name in enumerate(tiers['names']):
+                P_gross = float(p_gross[i, j])
+                is_too_expensive = bool(too_expensive[i, j]) if too_expensive_defined[i, j] else None
 
-                if tier_result['name'] == "Regular":
+                if tier_name in ("Regular", "Bundled"):
                     current_scenario_data['P_gross_regular'] = P_gross
                     current_scenario_data['is_too_expensive_regular'] = is_too_expensive
-                elif tier_result['name'] == "Merch-Inclusive":
+                elif tier_name == "Merch-Inclusive":
                     current_scenario_data['P_gross_merch'] = P_gross
                     current_scenario_data['is_too_expensive_merch'] = is_too_expensive
-                elif tier_result['name'] == "Bundled": 
-                    current_scenario_data['P_gross_regular'] = P_gross 
-                    current_scenario_data['is_too_expensive_regular'] = is_too_expensive
             
             scenarios_summary.append(current_scenario_data)
         return scenarios_summary
@@ -258,6 +355,7 @@ class SponsorshipManager:
             'Annual Budget After Commit ($)': self.remaining_annual_sponsorship
         }
         self.planned_events.append(event_data)
+        self._bump_version()
         st.write(f"DEBUG: Event '{event_name}' added. Current 'Ticket Details' in self.planned_events:", self.planned_events[-1]['Ticket Details']) 
         st.success(f"Event '{event_name}' committed...")
         return True
@@ -265,19 +363,30 @@ class SponsorshipManager:
     def get_planned_events_df_for_export(self):
         """Returns a DataFrame suitable for CSV export, with Ticket Details as JSON string."""
         if not self.planned_events:
-            st.write("DEBUG: No planned events to export.") # DEBUG LINE
             return pd.DataFrame()
-
-        st.write("DEBUG: `self.planned_events` in `get_planned_events_df_for_export` (showing first event's Ticket Details if exists):") 
-        if self.planned_events:
-            st.text(self.planned_events[0].get('Ticket Details', "N/A - First event has no Ticket Details key or no events")) 
-
-        return pd.DataFrame(self.planned_events)
+        export_df = pd.DataFrame(self.planned_events)
+        # Imported events hold Ticket Details as a list, committed ones as a JSON string
+        export_df['Ticket Details'] = export_df['Ticket Details'].map(
+            lambda details: details if isinstance(details, str) else json.dumps(details)
+        )
+        return export_df
+
+    def get_export_bytes(self, file_format="csv"):
+        """Serializes planned events to CSV or Parquet bytes, cached until the events change."""
+        def build():
+            export_df = self.get_planned_events_df_for_export()
+            if file_format == "parquet":
+                buffer = io.BytesIO()
+                export_df.to_parquet(buffer, index=False)
+                return buffer.getvalue()
+            return export_df.to_csv(index=False).encode('utf-8')
+        return self.cached_artifact(f"export_{file_format}", build)
 
     def load_events_from_df(self, df_to_load):
         """Loads events from a DataFrame, replacing current planned events."""
         self.planned_events = []
         self.remaining_annual_sponsorship = self.total_annual_sponsorship # Reset budget
+        self._bump_version()
         
         required_cols = ['Name', 'Sponsorship Allocated ($)', 'Merch Option', 'Ticket Details', 
                          'Total Expected Attendees (Overall)', 'Fixed Costs ($)']
@@ -323,10 +432,14 @@ class SponsorshipManager:
             # Rollback changes
             self.planned_events = [] 
             self.remaining_annual_sponsorship = self.total_annual_sponsorship
+            self._bump_version()
             return False
 
 
     def get_planned_events_summary_df(self):
+        return self.cached_artifact("summary_df", self._build_planned_events_summary_df)
+
+    def _build_planned_events_summary_df(self):
         if not self.planned_events:
             return pd.DataFrame()
         
@@ -405,245 +518,285 @@ st.sidebar.metric("Total Annual Budget", f"${manager.total_annual_sponsorship:,.
 st.sidebar.metric("Remaining Annual Budget", f"${manager.get_remaining_budget():,.2f}")
 
 st.sidebar.header("Data Management")
-# File uploader for CSV
-uploaded_file = st.sidebar.file_uploader("Import Planned Events (CSV)", type="csv", key="csv_uploader")
-if uploaded_file is not None:
-    try:
-        df_imported = pd.read_csv(uploaded_file)
-        if manager.load_events_from_df(df_imported):
-            # Force rerun to update displays after successful load (inidinite loop problem maybe here)
-            st.session_state.event_form_key_counter += 1 # Reset form
-            st.session_state.current_scenarios = [] 
-            st.rerun() 
-        else:
-            st.sidebar.error("Failed to process the imported CSV.")
-    except Exception as e:
-        st.sidebar.error(f"Error reading or processing CSV: {e}")
-
-# Download button for CSV
-if manager.planned_events: #
-    export_df = manager.get_planned_events_df_for_export()
-    if not export_df.empty and 'Ticket Details' in export_df.columns:
-        st.write("DEBUG: `export_df['Ticket Details'].head()` before to_csv:") # DEBUG LINE
-        st.text_area("DataFrame 'Ticket Details' (first 5)", export_df['Ticket Details'].head(5).to_string(), height=150) # DEBUG LINE
-    else:
-        st.write("DEBUG: export_df is empty or 'Ticket Details' column is missing before to_csv.") # DEBUG LINE
-    csv_export_data = export_df.to_csv(index=False).encode('utf-8')
-    st.sidebar.download_button(
-        label="Export Planned Events to CSV",
-        data=csv_export_data,
-        file_name='planned_events.csv',
-        mime='text/csv',
-        key="export_csv_button"
-    )
-else:
-    st.sidebar.info("No planned events to export yet.")
 
+@st.fragment
+def render_data_management():
+    manager = st.session_state.manager
+    # File uploader for CSV
+    uploaded_file = st.sidebar.file_uploader("Import Planned Events (CSV)", type="csv", key="csv_uploader")
+    if uploaded_file is not None:
+        try:
+            df_imported = pd.read_csv(uploaded_file)
+            if manager.load_events_from_df(df_imported):
+                # Force rerun to update displays after successful load (inidinite loop problem maybe here)
+                st.session_state.event_form_key_counter += 1 # Reset form
+                st.session_state.current_scenarios = [] 
+                st.rerun() 
+            else:
+                st.sidebar.error("Failed to process the imported CSV.")
+        except Exception as e:
+            st.sidebar.error(f"Error reading or processing CSV: {e}")
+
+    # Download buttons: export bytes are only serialized when the user clicks
+    if manager.planned_events:
+        st.sidebar.download_button(
+            label="Export Planned Events to CSV",
+            data=lambda: manager.get_export_bytes("csv"),
+            file_name='planned_events.csv',
+            mime='text/csv',
+            key="export_csv_button",
+            on_click="ignore"
+        )
+        if PARQUET_EXPORT_AVAILABLE:
+            st.sidebar.download_button(
+                label="Export Planned Events to Parquet",
+                data=lambda: manager.get_export_bytes("parquet"),
+                file_name='planned_events.parquet',
+                mime='application/vnd.apache.parquet',
+                key="export_parquet_button",
+                on_click="ignore"
+            )
+    else:
+        st.sidebar.info("No planned events to export yet.")
 
-st.sidebar.header("Global Event Defaults")
+render_data_management()
 
-default_refund_ui = st.sidebar.slider("Default Refund Rate (%)", 0, 20, int(DEFAULT_REFUND_RATE*100), key="default_refund_ui_k_csv") / 100.0
-default_platform_fee_ui = st.sidebar.slider("Default Platform Fee Rate (%)", 0, 20, int(DEFAULT_PLATFORM_FEE_RATE*100), key="default_platform_fee_ui_k_csv") / 100.0
-default_price_cap_ui = st.sidebar.number_input("Default Max Price Increase Cap ($)", min_value=0.0, value=DEFAULT_PRICE_INCREASE_CAP, step=1.0, key="default_price_cap_ui_k_csv")
 
+st.sidebar.header("Global Event Defaults")
 
+@st.fragment
+def render_global_defaults():
+    # Stored in session state under their keys; the planner fragment reads them from there
+    st.sidebar.slider("Default Refund Rate (%)", 0, 20, int(DEFAULT_REFUND_RATE*100), key="default_refund_ui_k_csv")
+    st.sidebar.slider("Default Platform Fee Rate (%)", 0, 20, int(DEFAULT_PLATFORM_FEE_RATE*100), key="default_platform_fee_ui_k_csv")
+    st.sidebar.number_input("Default Max Price Increase Cap ($)", min_value=0.0, value=DEFAULT_PRICE_INCREASE_CAP, step=1.0, key="default_price_cap_ui_k_csv")
+
+render_global_defaults()
+
+
+@st.fragment
+def render_scenario_planner():
+    manager = st.session_state.manager
+    default_refund_ui = st.session_state.default_refund_ui_k_csv / 100.0
+    default_platform_fee_ui = st.session_state.default_platform_fee_ui_k_csv / 100.0
+    default_price_cap_ui = st.session_state.default_price_cap_ui_k_csv
+
+    st.header("📊 Plan New Event Scenarios")
+    st.session_state.merch_option_ui = st.radio(
+        "Merchandise Option:",
+        ("No Merch", "Bundled Merch (for all tickets)", "Optional Merch Tickets (separate prices)"),
+        key="merch_option_radio_key_csv", 
+        index=["No Merch", "Bundled Merch (for all tickets)", "Optional Merch Tickets (separate prices)"].index(st.session_state.get('merch_option_ui', "No Merch"))
+    )
 
-st.header("📊 Plan New Event Scenarios")
-st.session_state.merch_option_ui = st.radio(
-    "Merchandise Option:",
-    ("No Merch", "Bundled Merch (for all tickets)", "Optional Merch Tickets (separate prices)"),
-    key="merch_option_radio_key_csv", 
-    index=["No Merch", "Bundled Merch (for all tickets)", "Optional Merch Tickets (separate prices)"].index(st.session_state.get('merch_option_ui', "No Merch"))
-)
+    event_form = st.form(key=f"event_planning_form_{st.session_state.event_form_key_counter}_csv")
+    with event_form:
+        st.subheader("Event Core Details")
+        event_name_form = st.text_input("Event Name", "My Awesome Event")
+        col1, col2 = st.columns(2)
+        with col1:
+            event_fixed_costs_form = st.number_input("Event Fixed Costs ($)", min_value=0.0, value=5000.0, step=100.0)
+            event_total_catering_cost_form = st.number_input("Event Total Catering Cost ($)", min_value=0.0, value=4000.0, step=50.0)
+        with col2:
+            total_expected_attendees_overall_form = st.number_input("Total Expected Attendees (Overall)", min_value=0, value=180, step=5, key="form_total_attendees_overall_csv")
+            last_year_regular_price_form = st.number_input("Last Year's Regular Ticket Price ($)", min_value=0.0, value=30.0, step=1.0, key="form_ly_reg_price_csv")
+
+        merch_unit_cost_submit = 0.0 
+        expected_merch_tickets_sold_submit = 0
+        last_year_merch_price_submit = 0.0
+
+        if st.session_state.merch_option_ui == "Bundled Merch (for all tickets)":
+            st.subheader("Merchandise (Bundled)")
+            merch_unit_cost_submit = st.number_input("Merch Cost Per Unit ($)", min_value=0.0, value=DEFAULT_MERCH_UNIT_COST, step=1.0, key="form_bundled_merch_cost_csv")
+        elif st.session_state.merch_option_ui == "Optional Merch Tickets (separate prices)":
+            st.subheader("Merchandise (Optional Tickets)")
+            col_m1, col_m2, col_m3 = st.columns(3)
+            with col_m1:
+                merch_unit_cost_submit = st.number_input("Merch Cost Per Unit ($)", min_value=0.0, value=DEFAULT_MERCH_UNIT_COST, step=1.0, key="form_optional_merch_cost_csv")
+            with col_m2:
+                expected_merch_tickets_sold_submit = st.number_input("Expected Merch Ticket Sales", min_value=0, max_value=total_expected_attendees_overall_form, value=50, step=1, key="form_optional_merch_sales_csv")
+            with col_m3:
+                default_ly_merch_price = last_year_regular_price_form + merch_unit_cost_submit 
+                last_year_merch_price_submit = st.number_input("Last Year's Merch Ticket Price ($)", min_value=0.0, value=default_ly_merch_price, step=1.0, key="form_optional_merch_ly_price_csv", help="If a similar merch ticket existed last year.")
+
+        st.subheader("Sponsorship & Pricing Constraints")
+        price_increase_cap_event_form = st.number_input("Max Price Increase Over Last Year ($)", min_value=0.0, value=default_price_cap_ui, step=1.0, key="form_event_price_cap_csv")
+        sponsor_allocations_str_form = st.text_input(
+            "Sponsorship Allocations to Test (comma-separated $)", "0, 100, 250, 500,1000,2000,3000,4000,5000", key="form_sponsor_alloc_str_csv"
+        )
+        calculate_scenarios_button = st.form_submit_button("Calculate Price Scenarios")
 
-event_form = st.form(key=f"event_planning_form_{st.session_state.event_form_key_counter}_csv")
-with event_form:
-    st.subheader("Event Core Details")
-    event_name_form = st.text_input("Event Name", "My Awesome Event")
-    col1, col2 = st.columns(2)
-    with col1:
-        event_fixed_costs_form = st.number_input("Event Fixed Costs ($)", min_value=0.0, value=5000.0, step=100.0)
-        event_total_catering_cost_form = st.number_input("Event Total Catering Cost ($)", min_value=0.0, value=4000.0, step=50.0)
-    with col2:
-        total_expected_attendees_overall_form = st.number_input("Total Expected Attendees (Overall)", min_value=0, value=180, step=5, key="form_total_attendees_overall_csv")
-        last_year_regular_price_form = st.number_input("Last Year's Regular Ticket Price ($)", min_value=0.0, value=30.0, step=1.0, key="form_ly_reg_price_csv")
-    
-    merch_unit_cost_submit = 0.0 
-    expected_merch_tickets_sold_submit = 0
-    last_year_merch_price_submit = 0.0
-
-    if st.session_state.merch_option_ui == "Bundled Merch (for all tickets)":
-        st.subheader("Merchandise (Bundled)")
-        merch_unit_cost_submit = st.number_input("Merch Cost Per Unit ($)", min_value=0.0, value=DEFAULT_MERCH_UNIT_COST, step=1.0, key="form_bundled_merch_cost_csv")
-    elif st.session_state.merch_option_ui == "Optional Merch Tickets (separate prices)":
-        st.subheader("Merchandise (Optional Tickets)")
-        col_m1, col_m2, col_m3 = st.columns(3)
-        with col_m1:
-            merch_unit_cost_submit = st.number_input("Merch Cost Per Unit ($)", min_value=0.0, value=DEFAULT_MERCH_UNIT_COST, step=1.0, key="form_optional_merch_cost_csv")
-        with col_m2:
-            expected_merch_tickets_sold_submit = st.number_input("Expected Merch Ticket Sales", min_value=0, max_value=total_expected_attendees_overall_form, value=50, step=1, key="form_optional_merch_sales_csv")
-        with col_m3:
-            default_ly_merch_price = last_year_regular_price_form + merch_unit_cost_submit 
-            last_year_merch_price_submit = st.number_input("Last Year's Merch Ticket Price ($)", min_value=0.0, value=default_ly_merch_price, step=1.0, key="form_optional_merch_ly_price_csv", help="If a similar merch ticket existed last year.")
-    
-    st.subheader("Sponsorship & Pricing Constraints")
-    price_increase_cap_event_form = st.number_input("Max Price Increase Over Last Year ($)", min_value=0.0, value=default_price_cap_ui, step=1.0, key="form_event_price_cap_csv")
-    sponsor_allocations_str_form = st.text_input(
-        "Sponsorship Allocations to Test (comma-separated $)", "0, 100, 250, 500,1000,2000,3000,4000,5000", key="form_sponsor_alloc_str_csv"
-    )
-    calculate_scenarios_button = st.form_submit_button("Calculate Price Scenarios")
+    if calculate_scenarios_button:
+        valid_inputs = True
+        merch_option_for_calc = st.session_state.merch_option_ui 
 
-if calculate_scenarios_button:
-    valid_inputs = True
-    merch_option_for_calc = st.session_state.merch_option_ui 
+        if merch_option_for_calc == "Optional Merch Tickets (separate prices)" and expected_merch_tickets_sold_submit > total_expected_attendees_overall_form:
+            st.error("Error: Expected Merch Ticket Sales cannot be greater than Total Expected Attendees.")
+            valid_inputs = False
+            st.session_state.current_scenarios = [] 
 
-    if merch_option_for_calc == "Optional Merch Tickets (separate prices)" and expected_merch_tickets_sold_submit > total_expected_attendees_overall_form:
-        st.error("Error: Expected Merch Ticket Sales cannot be greater than Total Expected Attendees.")
-        valid_inputs = False
-        st.session_state.current_scenarios = [] 
-        
-    if valid_inputs:
-        try:
-            sponsor_allocations_list = [s.strip() for s in sponsor_allocations_str_form.split(',') if s.strip()]
-            if not sponsor_allocations_list : 
-                st.error("Please enter at least one sponsorship allocation amount.")
+        if valid_inputs:
+            try:
+                sponsor_allocations_list = [s.strip() for s in sponsor_allocations_str_form.split(',') if s.strip()]
+                if not sponsor_allocations_list : 
+                    st.error("Please enter at least one sponsorship allocation amount.")
+                    st.session_state.current_scenarios = []
+                elif not all(s.replace('.', '', 1).lstrip('-').replace('.', '', 1).isdigit() for s in sponsor_allocations_list if s):
+                     st.error("Please enter valid comma-separated numbers for sponsorship allocations.")
+                     st.session_state.current_scenarios = []
+                else:
+                    st.session_state.current_scenarios = manager.plan_event_scenarios(
+                        event_name=event_name_form, event_fixed_costs=event_fixed_costs_form,
+                        event_total_catering_cost=event_total_catering_cost_form, 
+                        total_expected_attendees_overall=total_expected_attendees_overall_form,
+                        merch_option=merch_option_for_calc, 
+                        merch_unit_cost=merch_unit_cost_submit,
+                        expected_merch_tickets_sold_input=expected_merch_tickets_sold_submit, 
+                        last_year_regular_price=last_year_regular_price_form, 
+                        last_year_merch_price=last_year_merch_price_submit, 
+                        sponsor_allocations_to_test=sponsor_allocations_list,
+                        event_refund_rate=default_refund_ui, 
+                        event_platform_fee_rate=default_platform_fee_ui,
+                        price_increase_cap=price_increase_cap_event_form
+                    )
+            except Exception as e:
+                st.error(f"An error occurred during scenario calculation: {e}")
+                st.exception(e) 
                 st.session_state.current_scenarios = []
-            elif not all(s.replace('.', '', 1).lstrip('-').replace('.', '', 1).isdigit() for s in sponsor_allocations_list if s):
-                 st.error("Please enter valid comma-separated numbers for sponsorship allocations.")
-                 st.session_state.current_scenarios = []
-            else:
-                st.session_state.current_scenarios = manager.plan_event_scenarios(
-                    event_name=event_name_form, event_fixed_costs=event_fixed_costs_form,
-                    event_total_catering_cost=event_total_catering_cost_form, 
-                    total_expected_attendees_overall=total_expected_attendees_overall_form,
-                    merch_option=merch_option_for_calc, 
-                    merch_unit_cost=merch_unit_cost_submit,
-                    expected_merch_tickets_sold_input=expected_merch_tickets_sold_submit, 
-                    last_year_regular_price=last_year_regular_price_form, 
-                    last_year_merch_price=last_year_merch_price_submit, 
-                    sponsor_allocations_to_test=sponsor_allocations_list,
-                    event_refund_rate=default_refund_ui, 
-                    event_platform_fee_rate=default_platform_fee_ui,
-                    price_increase_cap=price_increase_cap_event_form
-                )
-        except Exception as e:
-            st.error(f"An error occurred during scenario calculation: {e}")
-            st.exception(e) 
-            st.session_state.current_scenarios = []
-
-
-if 'current_scenarios' in st.session_state and st.session_state.current_scenarios:
-
-    current_event_name_display = st.session_state.current_scenarios[0]['event_name']
-    current_merch_option_display = st.session_state.current_scenarios[0]['merch_option']
-    st.subheader(f"Price Scenarios for: {current_event_name_display} (Merch: {current_merch_option_display})")
-    scenarios_df_display = pd.DataFrame(st.session_state.current_scenarios)
-    display_cols = ['sponsor_allocation_tested', 'P_gross_regular', 'is_too_expensive_regular']
-    if current_merch_option_display == "Optional Merch Tickets (separate prices)":
-        if 'P_gross_merch' in scenarios_df_display.columns:
-             display_cols.extend(['P_gross_merch', 'is_too_expensive_merch'])
-    display_cols.extend(['potential_remaining_annual_budget', 'notes'])
-    display_cols = [col for col in display_cols if col in scenarios_df_display.columns]
-
-    def format_price_display(x): 
-        if pd.isnull(x): return "N/A"
-        if np.isinf(x): return "Inf"
-        return f"${x:,.2f}"
-    def format_bool_yes_no_na(x):
-        if pd.isnull(x): return "N/A"
-        return "Yes" if x else "No"
-
-    st.dataframe(
-        scenarios_df_display[display_cols].style.format({
-            "sponsor_allocation_tested": "${:,.2f}",
-            "P_gross_regular": format_price_display, "P_gross_merch": format_price_display,
-            "is_too_expensive_regular": format_bool_yes_no_na, "is_too_expensive_merch": format_bool_yes_no_na,
-            "potential_remaining_annual_budget": "${:,.2f}"
-        }),
-        hide_index=True, use_container_width=True
-    )
 
-    st.subheader("Commit an Event Plan from Scenarios")
-    committable_scenario_options = [] 
-    for i, s_scenario in enumerate(st.session_state.current_scenarios):
-        label_parts = [f"Sponsor: ${s_scenario['sponsor_allocation_tested']:,.2f}"]
-        valid_for_commit_flag = True
-        if s_scenario['notes'] and "Exceeds remaining annual budget" in s_scenario['notes'] :
-            label_parts.append("(Exceeds Budget!)")
-            valid_for_commit_flag = False 
-        elif s_scenario['notes']: 
-             label_parts.append(f"({s_scenario['notes']})")
-             if any(err_note in s_scenario['notes'] for err_note in ["No tickets to price", "Error in ticket number", "No ticket tiers defined", "Overall expected attendees is 0", "Input Error"]):
-                 valid_for_commit_flag = False
-        actual_reg_sold_scen = s_scenario.get('actual_regular_tickets_sold', 0)
-        actual_merch_sold_scen = s_scenario.get('actual_merch_tickets_sold', 0)
-        if s_scenario['merch_option'] == "Bundled Merch (for all tickets)": actual_reg_sold_scen = s_scenario['total_expected_attendees_overall']
-        if actual_reg_sold_scen > 0:
-            price_reg = s_scenario.get('P_gross_regular')
-            if pd.notnull(price_reg) and np.isfinite(price_reg):
-                label_parts.append(f"Reg/Bundle: {format_price_display(price_reg)}{' (Too Exp!)' if s_scenario.get('is_too_expensive_regular') else ''}")
-            else: 
-                label_parts.append("Reg/Bundle: Invalid/No Price"); valid_for_commit_flag = False
-        if s_scenario['merch_option'] == "Optional Merch Tickets (separate prices)" and actual_merch_sold_scen > 0 :
-            price_merch = s_scenario.get('P_gross_merch')
-            if pd.notnull(price_merch) and np.isfinite(price_merch):
-                label_parts.append(f"Merch: {format_price_display(price_merch)}{' (Too Exp!)' if s_scenario.get('is_too_expensive_merch') else ''}")
-            else: 
-                label_parts.append("Merch: Invalid/No Price"); valid_for_commit_flag = False
-        if valid_for_commit_flag: committable_scenario_options.append((" | ".join(label_parts), i))
 
-    if committable_scenario_options:
-        selected_scenario_display_option = st.selectbox(
-            "Select a scenario to commit:", options=committable_scenario_options, format_func=lambda x: x[0],
-            key="selectbox_commit_scenario_csv"
+    if 'current_scenarios' in st.session_state and st.session_state.current_scenarios:
+
+        current_event_name_display = st.session_state.current_scenarios[0]['event_name']
+        current_merch_option_display = st.session_state.current_scenarios[0]['merch_option']
+        st.subheader(f"Price Scenarios for: {current_event_name_display} (Merch: {current_merch_option_display})")
+        scenarios_df_display = pd.DataFrame(st.session_state.current_scenarios)
+        display_cols = ['sponsor_allocation_tested', 'P_gross_regular', 'is_too_expensive_regular']
+        if current_merch_option_display == "Optional Merch Tickets (separate prices)":
+            if 'P_gross_merch' in scenarios_df_display.columns:
+                 display_cols.extend(['P_gross_merch', 'is_too_expensive_merch'])
+        display_cols.extend(['potential_remaining_annual_budget', 'notes'])
+        display_cols = [col for col in display_cols if col in scenarios_df_display.columns]
+
+        def format_price_display(x): 
+            if pd.isnull(x): return "N/A"
+            if np.isinf(x): return "Inf"
+            return f"${x:,.2f}"
+        def format_bool_yes_no_na(x):
+            if pd.isnull(x): return "N/A"
+            return "Yes" if x else "No"
+
+        st.dataframe(
+            scenarios_df_display[display_cols].style.format({
+                "sponsor_allocation_tested": "${:,.2f}",
+                "P_gross_regular": format_price_display, "P_gross_merch": format_price_display,
+                "is_too_expensive_regular": format_bool_yes_no_na, "is_too_expensive_merch": format_bool_yes_no_na,
+                "potential_remaining_annual_budget": "${:,.2f}"
+            }),
+            hide_index=True, use_container_width=True
         )
-        if selected_scenario_display_option:
-            selected_scenario_index = selected_scenario_display_option[1]
-            scenario_to_commit_data = st.session_state.current_scenarios[selected_scenario_index]
-            st.write("You are about to commit:") 
-            commit_summary = {
-                "Event Name": scenario_to_commit_data['event_name'],
-                "Sponsorship to Allocate": f"${scenario_to_commit_data['sponsor_allocation_tested']:,.2f}",
-                "Merch Option": scenario_to_commit_data['merch_option'],
-            }
-            reg_sold_summary = scenario_to_commit_data.get('actual_regular_tickets_sold', 0)
-            merch_sold_summary = scenario_to_commit_data.get('actual_merch_tickets_sold', 0)
-            if scenario_to_commit_data['merch_option'] == "Bundled Merch (for all tickets)":
-                 reg_sold_summary = scenario_to_commit_data['total_expected_attendees_overall']
-            if reg_sold_summary > 0:
-                 commit_summary["Regular/Bundled Ticket Price"] = format_price_display(scenario_to_commit_data.get('P_gross_regular'))
-            if merch_sold_summary > 0 and scenario_to_commit_data['merch_option'] == "Optional Merch Tickets (separate prices)":
-                 commit_summary["Merch-Inclusive Ticket Price"] = format_price_display(scenario_to_commit_data.get('P_gross_merch'))
-            if scenario_to_commit_data['total_expected_attendees_overall'] == 0 :
-                 commit_summary["Pricing Note"] = "0 total attendees expected."
-            elif not commit_summary.get("Regular/Bundled Ticket Price") and \
-                 not commit_summary.get("Merch-Inclusive Ticket Price") and \
-                 (reg_sold_summary > 0 or merch_sold_summary > 0 or (scenario_to_commit_data['merch_option'] == "Bundled Merch (for all tickets)" and reg_sold_summary > 0) ) :
-                 commit_summary["Pricing Note"] = "No valid prices for expected sales."
-            st.json(commit_summary)
-
-            if st.button("Commit This Plan", key="commit_button_k_final_csv"):
-                if manager.commit_event_plan(scenario_to_commit_data):
-                    st.session_state.current_scenarios = [] 
-                    st.session_state.event_form_key_counter += 1 
-                    st.rerun()
-    else:
-        st.info("No scenarios currently available to commit. Check notes or adjust inputs.")
+        last_graph_run = manager.scenario_graph.last_run
+        st.caption(
+            f"Last calculation recomputed: {', '.join(last_graph_run['recomputed']) or 'nothing'} | "
+            f"reused: {', '.join(last_graph_run['reused']) or 'nothing'}"
+        )
+        graph_nodes = sorted(set(manager.scenario_graph.recompute_counts) | set(manager.scenario_graph.reuse_counts))
+        st.caption("Session totals (recomputed / reused): " + ", ".join(
+            f"{node} {manager.scenario_graph.recompute_counts.get(node, 0)}/{manager.scenario_graph.reuse_counts.get(node, 0)}"
+            for node in graph_nodes
+        ))
+
+        st.subheader("Commit an Event Plan from Scenarios")
+        committable_scenario_options = [] 
+        for i, s_scenario in enumerate(st.session_state.current_scenarios):
+            label_parts = [f"Sponsor: ${s_scenario['sponsor_allocation_tested']:,.2f}"]
+            valid_for_commit_flag = True
+            if s_scenario['notes'] and "Exceeds remaining annual budget" in s_scenario['notes'] :
+                label_parts.append("(Exceeds Budget!)")
+                valid_for_commit_flag = False 
+            elif s_scenario['notes']: 
+                 label_parts.append(f"({s_scenario['notes']})")
+                 if any(err_note in s_scenario['notes'] for err_note in ["No tickets to price", "Error in ticket number", "No ticket tiers defined", "Overall expected attendees is 0", "Input Error"]):
+                     valid_for_commit_flag = False
+            actual_reg_sold_scen = s_scenario.get('actual_regular_tickets_sold', 0)
+            actual_merch_sold_scen = s_scenario.get('actual_merch_tickets_sold', 0)
+            if s_scenario['merch_option'] == "Bundled Merch (for all tickets)": actual_reg_sold_scen = s_scenario['total_expected_attendees_overall']
+            if actual_reg_sold_scen > 0:
+                price_reg = s_scenario.get('P_gross_regular')
+                if pd.notnull(price_reg) and np.isfinite(price_reg):
+                    label_parts.append(f"Reg/Bundle: {format_price_display(price_reg)}{' (Too Exp!)' if s_scenario.get('is_too_expensive_regular') else ''}")
+                else: 
+                    label_parts.append("Reg/Bundle: Invalid/No Price"); valid_for_commit_flag = False
+            if s_scenario['merch_option'] == "Optional Merch Tickets (separate prices)" and actual_merch_sold_scen > 0 :
+                price_merch = s_scenario.get('P_gross_merch')
+                if pd.notnull(price_merch) and np.isfinite(price_merch):
+                    label_parts.append(f"Merch: {format_price_display(price_merch)}{' (Too Exp!)' if s_scenario.get('is_too_expensive_merch') else ''}")
+                else: 
+                    label_parts.append("Merch: Invalid/No Price"); valid_for_commit_flag = False
+            if valid_for_commit_flag: committable_scenario_options.append((" | ".join(label_parts), i))
+
+        if committable_scenario_options:
+            selected_scenario_display_option = st.selectbox(
+                "Select a scenario to commit:", options=committable_scenario_options, format_func=lambda x: x[0],
+                key="selectbox_commit_scenario_csv"
+            )
+            if selected_scenario_display_option:
+                selected_scenario_index = selected_scenario_display_option[1]
+                scenario_to_commit_data = st.session_state.current_scenarios[selected_scenario_index]
+                st.write("You are about to commit:") 
+                commit_summary = {
+                    "Event Name": scenario_to_commit_data['event_name'],
+                    "Sponsorship to Allocate": f"${scenario_to_commit_data['sponsor_allocation_tested']:,.2f}",
+                    "Merch Option": scenario_to_commit_data['merch_option'],
+                }
+                reg_sold_summary = scenario_to_commit_data.get('actual_regular_tickets_sold', 0)
+                merch_sold_summary = scenario_to_commit_data.get('actual_merch_tickets_sold', 0)
+                if scenario_to_commit_data['merch_option'] == "Bundled Merch (for all tickets)":
+                     reg_sold_summary = scenario_to_commit_data['total_expected_attendees_overall']
+                if reg_sold_summary > 0:
+                     commit_summary["Regular/Bundled Ticket Price"] = format_price_display(scenario_to_commit_data.get('P_gross_regular'))
+                if merch_sold_summary > 0 and scenario_to_commit_data['merch_option'] == "Optional Merch Tickets (separate prices)":
+                     commit_summary["Merch-Inclusive Ticket Price"] = format_price_display(scenario_to_commit_data.get('P_gross_merch'))
+                if scenario_to_commit_data['total_expected_attendees_overall'] == 0 :
+                     commit_summary["Pricing Note"] = "0 total attendees expected."
+                elif not commit_summary.get("Regular/Bundled Ticket Price") and \
+                     not commit_summary.get("Merch-Inclusive Ticket Price") and \
+                     (reg_sold_summary > 0 or merch_sold_summary > 0 or (scenario_to_commit_data['merch_option'] == "Bundled Merch (for all tickets)" and reg_sold_summary > 0) ) :
+                     commit_summary["Pricing Note"] = "No valid prices for expected sales."
+                st.json(commit_summary)
+
+                if st.button("Commit This Plan", key="commit_button_k_final_csv"):
+                    if manager.commit_event_plan(scenario_to_commit_data):
+                        st.session_state.current_scenarios = [] 
+                        st.session_state.event_form_key_counter += 1 
+                        st.rerun()
+        else:
+            st.info("No scenarios currently available to commit. Check notes or adjust inputs.")
+
+render_scenario_planner()
+
 
 def format_price_display(price):
     return "${:,.2f}".format(price)
 
 
 st.header("🗓️ Summary of Planned Events")
-planned_events_df_display = manager.get_planned_events_summary_df()
-if not planned_events_df_display.empty:
-    st.dataframe(
-        planned_events_df_display.style.format({
-            "Sponsorship Allocated ($)": "${:,.2f}", "Price ($)": format_price_display, 
-            "Fixed Costs ($)": "${:,.2f}", "Annual Budget After Commit ($)": "${:,.2f}",
-            "Sold (Est.)": "{:,.0f}"
-        }),
-        hide_index=True, use_container_width=True
-    )
-else:
-    st.info("No events have been planned and committed yet.")
\ No newline at end of file
+
+@st.fragment
+def render_planned_events_summary():
+    manager = st.session_state.manager
+    planned_events_df_display = manager.get_planned_events_summary_df()
+    if not planned_events_df_display.empty:
+        planned_events_styler = manager.cached_artifact(
+            "summary_styler",
+            lambda: planned_events_df_display.style.format({
+                "Sponsorship Allocated ($)": "${:,.2f}", "Price ($)": format_price_display, 
+                "Fixed Costs ($)": "${:,.2f}", "Annual Budget After Commit ($)": "${:,.2f}",
+                "Sold (Est.)": "{:,.0f}"
+            })
+        )
+        st.dataframe(planned_events_styler, hide_index=True, use_container_width=True)
+    else:
+        st.info("No events have been planned and committed yet.")
+
+render_planned_events_summary()